@@ -1,11 +1,15 @@
 #!/usr/bin/python3 -u
 
-from acurite523 import Acurite523
-from acurite609 import Acurite609
+from acurite import CHUNK_READ_TIME, MAX_EDGES
+from acurite523 import Acurite523, peek_preamble as peek_preamble523
+from acurite609 import Acurite609, peek_preamble as peek_preamble609
+from collections import deque
 from datetime import datetime
-from queue import Queue
+from gpiochip import GpioLine
 import ctypes
-import RPi.GPIO as GPIO
+import numpy as np
+import os
+import select
 import signal
 import socket
 import struct
@@ -13,41 +17,142 @@ import sys
 import threading
 import time
 
-CHUNK_READ_TIME = 1             # Time in seconds to read an RF signal chunk
+LISTENER_THREADS = 2            # Accept threads sharing the server port
+MAX_TX_BATCH = 100              # Datagrams to flush per sendmmsg call
+MULTICAST_TAG_NOISE = 5391
+RING_SIZE = 16                  # Payload broadcast ring capacity
+RT_CORE = 3                     # Core the capture thread is pinned to
+RT_PRIORITY = 80                # SCHED_FIFO priority of the capture thread
+
+# Prebuilt so the format string is only parsed once, not per datagram
+_NOISE_STRUCT = struct.Struct('<HIb')
+
+class Broadcast:
+    """Single-producer broadcast ring for received payloads. The producer
+    appends in O(1) regardless of subscriber count; each subscriber keeps
+    its own read cursor, so a slow subscriber can never block the RF
+    thread.
+    """
+    def __init__(self, size=RING_SIZE):
+        self._ring = [None] * size
+        self._size = size
+        self._seq = 0
+        self._cond = threading.Condition()
+
+    def publish(self, data):
+        """Appends a payload to the ring and wakes all subscribers.
+
+        :param data: the payload to broadcast
+        """
+        with self._cond:
+            self._ring[self._seq % self._size] = data
+            self._seq += 1
+            self._cond.notify_all()
+
+    def cursor(self):
+        """Returns a read cursor positioned after the newest payload.
+
+        :rtype: int
+        """
+        return self._seq
+
+    def wait(self, cursor, timeout=None):
+        """Waits for a payload newer than the given cursor.
+
+        :param int cursor: position returned by cursor() or a prior wait
+        :param timeout: timeout in seconds or None to wait indefinitely
+        :return: (cursor, data) pair; data is None on timeout
+        :rtype: tuple
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > cursor, timeout):
+                return cursor, None
+            # Skip payloads the subscriber fell too far behind to see
+            cursor = max(cursor, self._seq - self._size)
+            data = self._ring[cursor % self._size]
+            return cursor + 1, data
+
+class _iovec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+            ('iov_len', ctypes.c_size_t)]
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+            ('msg_namelen', ctypes.c_uint32),
+            ('msg_iov', ctypes.POINTER(_iovec)),
+            ('msg_iovlen', ctypes.c_size_t),
+            ('msg_control', ctypes.c_void_p),
+            ('msg_controllen', ctypes.c_size_t),
+            ('msg_flags', ctypes.c_int)]
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _msghdr),
+            ('msg_len', ctypes.c_uint)]
 
 class Acumonitor:
     def __init__(self, pin_rx, verbose=False, debug=False):
         self.updated = datetime.now()
         self.multicaster = None
+        self.multicast_noise_on = False
         self.pin_rx = pin_rx
-        self.waiters = []
-        self.libc = ctypes.CDLL('libc.so.6')
+        self.broadcast = Broadcast()
+        # Valid-chunk notifications also go through an eventfd so callers
+        # can plug this object straight into a selector or event loop via
+        # fileno(); the broadcast ring stays the path that carries payloads
+        self._evfd = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+        self._evpoller = select.epoll()
+        self._evpoller.register(self._evfd, select.EPOLLIN)
+        self.libc = ctypes.CDLL('libc.so.6', use_errno=True)
+        self._tx_queue = deque()
+        # Preallocated once so the capture loop never boxes per-edge ints
+        # or grows a list while a burst is in flight
+        self._dur_buf = np.empty(MAX_EDGES, dtype=np.int32)
+        self._rfs_buf = np.empty(MAX_EDGES, dtype=np.int8)
+        self.verbose = verbose
+        self.debug = debug
         self.print_verbose = print if verbose else lambda *a, **k: None
         self.print_debug = print if debug else lambda *a, **k: None
         self.acurite523 = Acurite523(pin_rx, verbose, debug)
         self.acurite609 = Acurite609(pin_rx, verbose, debug)
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.pin_rx, GPIO.IN)
+        self.line = None
+        self.running = False
         def handler(s, f):
             self.stop()
             sys.exit(0)
         signal.signal(signal.SIGINT, handler)
 
-    def enable_multicast(self, addr, port, noise=False):
+    def enable_multicast(self, addr, port, noise=False, iface_addr=None):
         self.multicast_addr = addr
         self.multicast_port = port
+        self.multicast_noise_on = noise
         self.multicaster = socket.socket(
                 socket.AF_INET, socket.SOCK_DGRAM)
         self.multicaster.setsockopt(
                 socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 60)
+        # A large send buffer keeps sustained noise multicast from filling
+        # the default buffer and blocking the flush
+        self.multicaster.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        # No subscribers run on this host, so skip the kernel's loopback
+        # copy of every datagram
+        self.multicaster.setsockopt(
+                socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 0)
+        if iface_addr:
+            # Pin the egress interface to spare a route lookup per send
+            self.multicaster.setsockopt(
+                    socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                    socket.inet_aton(iface_addr))
         self.acurite523.set_multicaster(
                 self.multicaster, addr, port, noise)
         self.acurite609.set_multicaster(
                 self.multicaster, addr, port, noise)
 
-    def enable_server(self, port):
-        threading.Thread(
-                target=self.start_server, args=(port,), daemon=True).start()
+    def enable_server(self, port, listeners=LISTENER_THREADS):
+        # SO_REUSEPORT lets every listener bind the same port; the kernel
+        # spreads incoming connections across them
+        for _ in range(listeners):
+            threading.Thread(
+                    target=self.start_server, args=(port,), daemon=True).start()
 
     def start_server(self, port):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -56,13 +161,20 @@ class Acumonitor:
         sock.listen()
         while True:
             s, a = sock.accept()
-            threading.Thread(target=self.accept_connection, args=(s, a), 
+            threading.Thread(target=self.accept_connection, args=(s, a),
                     daemon=True).start()
 
     def accept_connection(self, sock, addr):
         print(f'Connected to {addr}')
+        # Stat payloads are a few bytes each; without TCP_NODELAY Nagle
+        # holds them back for up to 40 ms per send
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 64 * 1024)
+        # One cursor for the lifetime of the connection: no re-subscribing
+        # per payload, and nothing published between waits is missed
+        cursor = self.broadcast.cursor()
         while True:
-            data = self.available(timeout=70)
+            cursor, data = self.broadcast.wait(cursor, timeout=70)
             if data:
                 try:
                     sock.send(data)
@@ -71,11 +183,62 @@ class Acumonitor:
                     return
 
     def multicast_stats(self, data):
-        try:
-            self.multicaster.sendto(
-                    data, (self.multicast_addr, self.multicast_port))
-        except Exception as e:
-            print(f'Stat multicast failed: {type(e)}: {e}')
+        self._tx_queue.append(data)
+
+    def multicast_noise(self, duration, rfs):
+        """Queues an RF noise signal for multicast.
+
+        :param int duration: signal duration, in microseconds
+        :param int rfs: RF signal received; either 0 or 1
+        """
+        self._tx_queue.append(
+                _NOISE_STRUCT.pack(MULTICAST_TAG_NOISE, duration, rfs))
+
+    def _sendmmsg(self, batch):
+        """Sends a batch of datagrams to the multicast address with a
+        single sendmmsg system call.
+
+        :param list batch: list of payloads to send
+        """
+        dest = struct.pack('=HH4s8x', socket.AF_INET,
+                socket.htons(self.multicast_port),
+                socket.inet_aton(self.multicast_addr))
+        name = ctypes.create_string_buffer(dest, len(dest))
+        bufs = [ctypes.create_string_buffer(data, len(data))
+                for data in batch]
+        iovs = (_iovec * len(batch))()
+        msgs = (_mmsghdr * len(batch))()
+        for i, buf in enumerate(bufs):
+            iovs[i].iov_base = ctypes.cast(buf, ctypes.c_void_p)
+            iovs[i].iov_len = len(batch[i])
+            msgs[i].msg_hdr.msg_name = ctypes.cast(name, ctypes.c_void_p)
+            msgs[i].msg_hdr.msg_namelen = len(dest)
+            msgs[i].msg_hdr.msg_iov = ctypes.pointer(iovs[i])
+            msgs[i].msg_hdr.msg_iovlen = 1
+        sent = self.libc.sendmmsg(
+                self.multicaster.fileno(), msgs, len(batch), 0)
+        if sent < 0:
+            raise OSError(ctypes.get_errno(), 'sendmmsg failed')
+
+    def _flush_tx(self):
+        """Flushes all queued outgoing datagrams, batching up to
+        MAX_TX_BATCH of them per system call. Falls back to one sendto per
+        datagram if sendmmsg is unavailable.
+        """
+        while self._tx_queue:
+            batch = [self._tx_queue.popleft() for _ in
+                    range(min(len(self._tx_queue), MAX_TX_BATCH))]
+            try:
+                self._sendmmsg(batch)
+            except Exception as e:
+                if self.debug:
+                    self.print_debug(f'sendmmsg failed: {type(e)}: {e}')
+                for data in batch:
+                    try:
+                        self.multicaster.sendto(data,
+                                (self.multicast_addr, self.multicast_port))
+                    except Exception as e:
+                        print(f'Stat multicast failed: {type(e)}: {e}')
 
     def update_stats(self, device, signal_type):
         data = device.create_payload(signal_type)
@@ -83,41 +246,108 @@ class Acumonitor:
             self.multicast_stats(data)
 
         # Notify other threads
-        for waiter in self.waiters:
-            waiter.put(data)
-
-    def read_rf(self, channel):
-        """Callback function that reads a continous stream of RF pulses for 1 
-        or more seconds while performing analog to digital conversion via the 
-        model-specific parsing function. The parsing function attempts to 
-        filter out any noise and build a valid chunk of binary data comprising 
-        the temperature, humidity, etc.
+        self.broadcast.publish(data)
+        os.eventfd_write(self._evfd, 1)
+
+    def capture_rf(self, event):
+        """Reads a continuous stream of RF pulses for 1 or more seconds and
+        records the duration and state of each edge. No parsing is done here;
+        the loop only blocks on kernel edge events, whose nanosecond
+        timestamps date each transition far more precisely than polling the
+        pin from user space ever could.
+
+        :param tuple event: the (timestamp_ns, rising) edge event that
+            opened the read window
+        :return: number of edges recorded into the duration/state buffers
+        :rtype: int
+        """
+        n = 0
+        # Bind everything the loop touches to locals; attribute and module
+        # lookups cost a dict probe per iteration otherwise
+        dur_buf = self._dur_buf
+        rfs_buf = self._rfs_buf
+        read_events = self.line.read_events
+        monotonic_ns = time.monotonic_ns
+        prev_ts, rising = event
+        deadline = prev_ts + CHUNK_READ_TIME * 1_000_000_000
+
+        # Allow at least CHUNK_READ_TIME seconds to read all RF signals
+        while True:
+            remaining = (deadline - monotonic_ns()) // 1_000_000
+            if remaining <= 0:
+                break
+            batch = read_events(timeout=remaining)
+            if batch is None:
+                continue
+            timestamps, rising = batch
+            # Durations between consecutive edges, including the gap back
+            # to the last edge of the previous batch
+            durations = np.diff(timestamps, prepend=prev_ts) // 1000
+            # The receiver output is inverted: the level that just ended was
+            # low (rfs 1) when the edge rises and high (rfs 0) when it falls
+            keep = durations >= 100
+            k = min(int(keep.sum()), MAX_EDGES - n)
+            dur_buf[n:n + k] = durations[keep][:k]
+            rfs_buf[n:n + k] = rising[keep][:k]
+            n += k
+            prev_ts = int(timestamps[-1])
+        return n
+
+    def set_realtime(self):
+        """Pins the capture thread to its own core and switches it to the
+        SCHED_FIFO real-time scheduler so the server and multicast threads
+        cannot preempt it mid-pulse. Requires root (or CAP_SYS_NICE) and at
+        least RT_CORE + 1 cores; scheduling stays best-effort otherwise.
+        For full isolation pair this with the isolcpus=3 kernel boot
+        parameter.
+        """
+        try:
+            os.sched_setaffinity(0, {RT_CORE})
+        except OSError as e:
+            self.print_verbose(f'# could not pin capture thread: {e}')
+        try:
+            os.sched_setscheduler(
+                    0, os.SCHED_FIFO, os.sched_param(RT_PRIORITY))
+        except OSError as e:
+            self.print_verbose(f'# could not enable SCHED_FIFO: {e}')
+
+    def capture_loop(self):
+        """Blocks until the first edge of an RF burst arrives, then hands
+        the burst over to read_rf. Runs on its own daemon thread.
+        """
+        self.set_realtime()
+        while self.running:
+            event = self.line.read_event(timeout=1000)
+            if event:
+                self.read_rf(event)
+
+    def read_rf(self, event):
+        """Captures a chunk of RF pulses and performs analog to digital
+        conversion via the model-specific parsing functions.
+        The parsing functions attempt to filter out any noise and build a
+        valid chunk of binary data comprising the temperature, humidity, etc.
+
+        Capturing and parsing are split into two passes so that the capture
+        loop does the bare minimum of work per sample; all per-edge parsing
+        happens after the read window has closed.
         """
-        count = 0
-        elapsed = 0     # Seconds since initial RF signal received
-        prev_rfs = -1
-        start = birth = datetime.now()
         builder523 = self.acurite523.ChunkBuilder()
         builder609 = self.acurite609.ChunkBuilder()
+        n = self.capture_rf(event)
+        durations = self._dur_buf[:n]
+        states = self._rfs_buf[:n]
 
-        # Allow at least CHUNK_READ_TIME seconds to read all RF signals
-        while elapsed < CHUNK_READ_TIME:
-            rfs = GPIO.input(self.pin_rx) ^ 1
-            now = datetime.now()
-            if prev_rfs >= 0 and rfs != prev_rfs:
-                duration = (now - birth).microseconds
-                if duration >= 100:
-                    if self.multicaster and self.multicast_noise_on:
-                        self.multicast_noise(duration, prev_rfs)
-                    # Parse model-specific RF pulses
-                    builder523.parse_rf(duration, prev_rfs)
-                    builder609.parse_rf(duration, prev_rfs)
-            if rfs != prev_rfs:
-                birth = now
-            elapsed = (now - start).seconds
-            prev_rfs = rfs
-            count += 1
-            self.libc.usleep(1) # Avoids heavy CPU usage when high noise
+        # Each chunk belongs to exactly one protocol, so sniff the edge
+        # array for each model's preamble and only run the decoders that
+        # could possibly match
+        if n:
+            if peek_preamble523(durations, states):
+                builder523.parse_edges(durations, states)
+            if peek_preamble609(durations, states):
+                builder609.parse_edges(durations, states)
+            if self.multicaster and self.multicast_noise_on:
+                for duration, rfs in zip(durations.tolist(), states.tolist()):
+                    self.multicast_noise(duration, rfs)
 
         # Now validate model-specific data
         if signal_type := self.acurite523.validate_rf(builder523):
@@ -125,6 +355,20 @@ class Acumonitor:
         if signal_type := self.acurite609.validate_rf(builder609):
             self.update_stats(self.acurite609, signal_type)
 
+        # Flush everything queued during this window in as few system
+        # calls as possible
+        if self.multicaster:
+            self._flush_tx()
+
+    def fileno(self):
+        """Returns a descriptor that becomes readable whenever a valid
+        chunk arrives, for use with selectors or an asyncio event loop.
+        Call available(timeout=0) after readiness to drain it.
+
+        :rtype: int
+        """
+        return self._evfd
+
     def available(self, timeout=None):
         """Waits until an RF signal chunk with at least one valid block is
         received or the timeout has been reached.
@@ -133,26 +377,30 @@ class Acumonitor:
         :return: True if successful, False on timeout
         :rtype: bool
         """
-        data = None
-        waiter = Queue()
-        self.waiters.append(waiter)
+        if not self._evpoller.poll(-1 if timeout is None else timeout):
+            return False
         try:
-            data = waiter.get(block=True, timeout=timeout)
-        except Exception:
-            data = None
-        self.waiters.remove(waiter)
-        return data
+            os.eventfd_read(self._evfd)
+        except BlockingIOError:
+            # Another waiter drained the counter first; a chunk still
+            # arrived, which is all the caller asked about
+            pass
+        return True
 
     def start(self):
         """Start listening for signals from the RF module.
         """
         self.begin = datetime.now()
         self.print_verbose('# started script')
-        GPIO.add_event_detect(self.pin_rx, GPIO.FALLING, self.read_rf)
+        self.line = GpioLine(self.pin_rx)
+        self.running = True
+        threading.Thread(target=self.capture_loop, daemon=True).start()
 
     def stop(self):
         """Stop listening for signals.
         """
-        GPIO.remove_event_detect(self.pin_rx)
-        GPIO.cleanup()
+        self.running = False
+        if self.line:
+            self.line.close()
+            self.line = None
 
@@ -1,8 +1,10 @@
 #!/usr/bin/python3 -u
 
-from datetime import datetime
+from gpiochip import GpioLine
 import ctypes
-import RPi.GPIO as GPIO
+import numpy as np
+import os
+import select
 import signal
 import socket
 import struct
@@ -10,13 +12,65 @@ import sys
 import threading
 import time
 
+CHUNK_READ_TIME = 1             # Time in seconds to read an RF signal chunk
+MAX_EDGES = 65536               # Edge buffer capacity per read window
 MULTICAST_TAG_NOISE = 5391
 
+# Prebuilt so the format string is only parsed once, not per datagram
+_NOISE_STRUCT = struct.Struct('<HIb')
+
+# Numba is an optional accelerator: when installed, the decode kernels are
+# compiled to machine code; otherwise they run as plain Python
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        def wrap(func):
+            return func
+        if args and callable(args[0]):
+            return args[0]
+        return wrap
+
+def build_rfs_table(bins_off, types_off, bins_on, types_on, bucket_us,
+        bucket_max):
+    """Builds a duration to signal type lookup table from a model's bin
+    edges, one row per RF state and one column per duration bucket. All
+    range boundaries fall on bucket edges, so classification reduces to a
+    table load. Shared by both model modules.
+
+    :param bins_off: duration bin edges for the off (rfs 0) state
+    :param types_off: signal type for each off-state bin
+    :param bins_on: duration bin edges for the on (rfs 1) state
+    :param types_on: signal type for each on-state bin
+    :param int bucket_us: bucket width in microseconds
+    :param int bucket_max: saturation bucket index
+    :rtype: numpy.ndarray
+    """
+    buckets = np.arange(bucket_max + 1, dtype=np.int32) * bucket_us
+    table = np.empty((2, bucket_max + 1), dtype=np.int8)
+    table[0] = types_off[np.searchsorted(bins_off, buckets, side='right')]
+    table[1] = types_on[np.searchsorted(bins_on, buckets, side='right')]
+    return table
+
 class Acurite:
     def __init__(self, pin_rx, verbose=False, debug=False):
         self.multicaster = None
         self.multicast_noise_on = False
         self.pin_rx = pin_rx
+        self.line = None
+        self.running = False
+        # Valid-chunk notifications go through an eventfd: the capture
+        # thread posts with one lock-free write and available() blocks on
+        # the descriptor, so neither side touches a lock
+        self._evfd = os.eventfd(0, os.EFD_CLOEXEC | os.EFD_NONBLOCK)
+        self._evpoller = select.epoll()
+        self._evpoller.register(self._evfd, select.EPOLLIN)
+        # Preallocated once so the capture loop never boxes per-edge ints
+        # or grows a list while a burst is in flight
+        self._dur_buf = np.empty(MAX_EDGES, dtype=np.int32)
+        self._rfs_buf = np.empty(MAX_EDGES, dtype=np.int8)
+        self.verbose = verbose
+        self.debug = debug
         self.print_verbose = print if verbose else lambda *a, **k: None
         self.print_debug = print if debug else lambda *a, **k: None
         def handler(s, f):
@@ -24,6 +78,103 @@ class Acurite:
             sys.exit(0)
         signal.signal(signal.SIGINT, handler)
 
+    def start(self):
+        """Start listening for signals from the RF module.
+        """
+        self.line = GpioLine(self.pin_rx)
+        self.running = True
+        threading.Thread(target=self.capture_loop, daemon=True).start()
+
+    def stop(self):
+        """Stop listening for signals.
+        """
+        self.running = False
+        if self.line:
+            self.line.close()
+            self.line = None
+
+    def capture_loop(self):
+        """Blocks until the first edge of an RF burst arrives, then hands
+        the burst over to read_rf. Runs on its own daemon thread.
+        """
+        while self.running:
+            event = self.line.read_event(timeout=1000)
+            if event:
+                self.read_rf(event)
+
+    def capture_rf(self, event):
+        """Reads a continuous stream of RF pulses for 1 or more seconds and
+        records the duration and state of each edge from kernel edge
+        events. No parsing is done here.
+
+        :param tuple event: the (timestamp_ns, rising) edge event that
+            opened the read window
+        :return: number of edges recorded into the duration/state buffers
+        :rtype: int
+        """
+        n = 0
+        dur_buf = self._dur_buf
+        rfs_buf = self._rfs_buf
+        read_events = self.line.read_events
+        monotonic_ns = time.monotonic_ns
+        prev_ts, rising = event
+        deadline = prev_ts + CHUNK_READ_TIME * 1_000_000_000
+        while True:
+            remaining = (deadline - monotonic_ns()) // 1_000_000
+            if remaining <= 0:
+                break
+            batch = read_events(timeout=remaining)
+            if batch is None:
+                continue
+            timestamps, rising = batch
+            # Durations between consecutive edges, including the gap back
+            # to the last edge of the previous batch
+            durations = np.diff(timestamps, prepend=prev_ts) // 1000
+            # The receiver output is inverted: the level that just ended was
+            # low (rfs 1) when the edge rises and high (rfs 0) when it falls
+            keep = durations >= 100
+            k = min(int(keep.sum()), MAX_EDGES - n)
+            dur_buf[n:n + k] = durations[keep][:k]
+            rfs_buf[n:n + k] = rising[keep][:k]
+            n += k
+            prev_ts = int(timestamps[-1])
+        return n
+
+    def read_rf(self, event):
+        """Captures a chunk of RF pulses and runs this model's parser and
+        validator over them, waking any available() callers when a valid
+        chunk arrives.
+        """
+        builder = self.ChunkBuilder()
+        n = self.capture_rf(event)
+        durations = self._dur_buf[:n]
+        states = self._rfs_buf[:n]
+        if n:
+            builder.parse_edges(durations, states)
+        if self.multicaster and self.multicast_noise_on:
+            for duration, rfs in zip(durations.tolist(), states.tolist()):
+                self.multicast_noise(duration, rfs)
+        if self.validate_rf(builder):
+            os.eventfd_write(self._evfd, 1)
+
+    def available(self, timeout=None):
+        """Waits until an RF signal chunk with at least one valid block is
+        received or the timeout has been reached.
+
+        :param int timeout: timeout in seconds or None to wait indefinitely
+        :return: True if successful, False on timeout
+        :rtype: bool
+        """
+        if not self._evpoller.poll(-1 if timeout is None else timeout):
+            return False
+        try:
+            os.eventfd_read(self._evfd)
+        except BlockingIOError:
+            # Another waiter drained the counter first; a chunk still
+            # arrived, which is all the caller asked about
+            pass
+        return True
+
     def set_multicaster(self, multicaster, addr, port, noise=False):
         self.multicaster = multicaster
         self.multicast_addr = addr
@@ -35,7 +186,7 @@ class Acurite:
 
         :param int data: number of pulses received in a single second
         """
-        data = struct.pack('<HIb', MULTICAST_TAG_NOISE, duration, rfs)
+        data = _NOISE_STRUCT.pack(MULTICAST_TAG_NOISE, duration, rfs)
         try:
             self.multicaster.sendto(
                     data, (self.multicast_addr, self.multicast_port))
@@ -24,10 +24,10 @@ while True:
         print(f'timeout')
 """
 
-from acurite import Acurite
+from acurite import Acurite, build_rfs_table, njit
 from datetime import datetime
 import ctypes
-import RPi.GPIO as GPIO
+import numpy as np
 import signal
 import socket
 import struct
@@ -48,35 +48,196 @@ CHANNEL_ID = 0                  # Not used here for now
 SIG_FREEZER = 0xc049            # Signatures seem to be hardcoded?
 SIG_FRIDGE = 0xc07c
 
+__all__ = ['Acurite523', 'SIG_FREEZER', 'SIG_FRIDGE', 'classify',
+        'get_rfs_type', 'peek_preamble']
+
+# Prebuilt so the format string is only parsed once, not per payload
+_PAYLOAD_STRUCT = struct.Struct('<Hbbh')
+
+# Duration bin edges and matching signal types for each RF state, used to
+# classify whole edge arrays in one vectorized pass
+_BINS_OFF = np.array([100, 300, 500, 700], dtype=np.int32)
+_TYPES_OFF = np.array([SIGNAL_INV, SIGNAL_BIT_0_OFF, SIGNAL_BIT_1_OFF,
+        SIGNAL_BLOCK_OFF, SIGNAL_INV], dtype=np.int8)
+_BINS_ON = np.array([100, 300, 500, 700, 20000, 60000], dtype=np.int32)
+_TYPES_ON = np.array([SIGNAL_INV, SIGNAL_BIT_1_ON, SIGNAL_BIT_0_ON,
+        SIGNAL_BLOCK_ON, SIGNAL_INV, SIGNAL_CHUNK_END, SIGNAL_INV],
+        dtype=np.int8)
+
+_BUCKET_US = 100                # Lookup table bucket width in microseconds
+_BUCKET_MAX = 600               # Durations >= 60000 us saturate here
+
+_RFS_TABLE = build_rfs_table(_BINS_OFF, _TYPES_OFF, _BINS_ON,
+        _TYPES_ON, _BUCKET_US, _BUCKET_MAX)
+
+# Tenths of a degree C for every 14-bit raw temperature, so decoding a
+# candidate block is a table load and the whole validation path stays in
+# integer arithmetic; callers only see a float at the property boundary
+_TEMP_LUT = ((np.arange(1 << 14) * 10 - 18000) // 18).astype(np.int16)
+
+# Bit masks indexed by bit position, so accumulating a bit is a table
+# load instead of a shift computed per bit
+_BIT_MASKS = np.int64(1) << np.arange(
+        SIGNAL_BIT_LENGTH - 1, -1, -1, dtype=np.int64)
+
+def classify(durations, rfs):
+    """Classifies an entire array of RF edges in a single NumPy pass.
+
+    :param durations: array of signal durations, in microseconds
+    :param rfs: array of RF signals received; each either 0 or 1
+    :return: array of signal types, one per edge
+    :rtype: numpy.ndarray
+    """
+    return _RFS_TABLE[rfs, np.minimum(durations // _BUCKET_US, _BUCKET_MAX)]
+
+def get_rfs_type(rfs, duration):
+    """Returns the type of RF signal received.
+
+    :param int rfs: RF signal received; either 0 or 1
+    :param int duration: signal duration, in microseconds
+    :return: the signal type
+    :rtype: int
+    """
+    return int(_RFS_TABLE[rfs, min(duration // _BUCKET_US, _BUCKET_MAX)])
+
+def peek_preamble(durations, rfs):
+    """Cheaply checks whether an edge array could contain a 523 chunk by
+    looking for the ~600 us on-pulses that open every block.
+
+    :param durations: array of signal durations, in microseconds
+    :param rfs: array of RF signals received; each either 0 or 1
+    :rtype: bool
+    """
+    return bool(np.any((rfs == 1) & (durations >= 500) & (durations < 700)))
+
+@njit(cache=True)
+def _parse_stream(durations, rfs, last_rfs_type, chunk_open, block_open,
+        block_size, block, block_opener_count, is_acurite, out_blocks):
+    """Classifies an array of RF edges and runs the chunk-building state
+    machine over them in a single streaming pass, so the intermediate
+    signal-type array is never materialized. The whole decode is
+    integer-only, so numba (when installed) compiles this to machine
+    code; the pure-Python fallback is the same function.
+
+    :param durations: array of signal durations, in microseconds
+    :param rfs: array of RF signals received; each either 0 or 1
+    :param out_blocks: int64 output array for completed blocks
+    :return: (block count, last_rfs_type, chunk_open, block_open,
+        block_size, block, block_opener_count, is_acurite)
+    :rtype: tuple
+    """
+    n = 0
+    for i in range(durations.shape[0]):
+        bucket = durations[i] // _BUCKET_US
+        if bucket > _BUCKET_MAX:
+            bucket = _BUCKET_MAX
+        rfs_type = _RFS_TABLE[rfs[i], bucket]
+        if last_rfs_type == SIGNAL_BLOCK_OFF or not chunk_open:
+            if rfs_type == SIGNAL_BLOCK_ON:
+                block_opener_count += 1
+            if block_opener_count == 4:
+                block_opener_count = 0
+                if not chunk_open:
+                    # Chunk start
+                    chunk_open = True
+                    block_open = True
+                    is_acurite = True
+                    block_size = 0
+                    block = 0
+                # Block start
+        elif last_rfs_type == SIGNAL_BIT_0_OFF and chunk_open:
+            if rfs_type == SIGNAL_BIT_0_ON and block_size < SIGNAL_BIT_LENGTH:
+                block_size += 1
+            elif rfs_type == SIGNAL_BIT_1_ON and block_size == SIGNAL_BIT_LENGTH:
+                # Block end
+                if n < out_blocks.shape[0]:
+                    out_blocks[n] = block
+                    n += 1
+                block_open = False
+                block_size = 0
+                block = 0
+            elif rfs_type == SIGNAL_CHUNK_END:
+                # Chunk end
+                block_open = False
+                chunk_open = False
+                block_size = 0
+                block = 0
+            block_opener_count = 0
+        elif last_rfs_type == SIGNAL_BIT_1_OFF and chunk_open:
+            if rfs_type == SIGNAL_BIT_1_ON and block_size < SIGNAL_BIT_LENGTH:
+                block |= _BIT_MASKS[block_size]
+                block_size += 1
+        elif rfs_type == SIGNAL_INV:
+            block_opener_count = 0
+            block_open = False
+            chunk_open = False
+            block_size = 0
+            block = 0
+        last_rfs_type = rfs_type
+    return (n, last_rfs_type, chunk_open, block_open, block_size, block,
+            block_opener_count, is_acurite)
+
+# Warm the JIT cache at import so the first real chunk never pays the
+# compile cost mid-signal
+_parse_stream(np.zeros(1, dtype=np.int32), np.zeros(1, dtype=np.int8),
+        SIGNAL_INV, False, False, 0, 0, 0, False,
+        np.empty(1, dtype=np.int64))
+
 class Acurite523(Acurite):
     def __init__(self, pin_rx, verbose=False, debug=False):
         super().__init__(pin_rx, verbose, debug)
-        self.freezer_signature = -1
-        self.freezer_battery = -1
-        self.freezer_signal = 0
-        self.freezer_temp = None
-        self.fridge_signature = -1
-        self.fridge_battery = -1
-        self.fridge_signal = 0
-        self.fridge_temp = None
+        # Per-device state keyed by signature, so block validation and
+        # payload building dispatch with one dict lookup and adding a new
+        # device is just another entry here
+        self.devices = {
+            SIG_FREEZER: {'name': 'freezer', 'signature': -1,
+                    'battery': -1, 'signal': 0, 'temp_tenths': None},
+            SIG_FRIDGE: {'name': 'fridge', 'signature': -1,
+                    'battery': -1, 'signal': 0, 'temp_tenths': None},
+        }
+
+    @property
+    def freezer_temp(self):
+        tenths = self.devices[SIG_FREEZER]['temp_tenths']
+        return None if tenths is None else tenths / 10
+
+    @property
+    def freezer_battery(self):
+        return self.devices[SIG_FREEZER]['battery']
+
+    @property
+    def freezer_signal(self):
+        return self.devices[SIG_FREEZER]['signal']
+
+    @property
+    def fridge_temp(self):
+        tenths = self.devices[SIG_FRIDGE]['temp_tenths']
+        return None if tenths is None else tenths / 10
+
+    @property
+    def fridge_battery(self):
+        return self.devices[SIG_FRIDGE]['battery']
+
+    @property
+    def fridge_signal(self):
+        return self.devices[SIG_FRIDGE]['signal']
 
     def create_payload(self, signal_type):
-        if signal_type == SIG_FREEZER:
-            return struct.pack('<Hbbh', SIG_FREEZER, self.freezer_battery, 
-                    self.freezer_signal, int(self.freezer_temp * 10))
-        if signal_type == SIG_FRIDGE:
-            return struct.pack('<Hbbh', SIG_FRIDGE, self.fridge_battery, 
-                    self.fridge_signal, int(self.fridge_temp * 10))
-        return None
+        device = self.devices.get(signal_type)
+        if device is None:
+            return None
+        return _PAYLOAD_STRUCT.pack(signal_type, device['battery'],
+                device['signal'], device['temp_tenths'])
 
     def validate_checksum(self, block):
         checksum = block & 0xff
-        calculated = (((block >> 8) & 0xff) + 
-                ((block >> 16) & 0xff) +
-                ((block >> 24) & 0xff) + 
-                ((block >> 32) & 0xff) + 
-                ((block >> 40))) & 0xff
-        if checksum != calculated:
+        # Sum the five payload bytes SWAR-style: fold adjacent bytes into
+        # 16-bit lanes, then fold the lanes together; only the low byte of
+        # the total matters
+        s = block >> 8
+        s = (s & 0x00ff00ff00ff) + ((s >> 8) & 0x00ff00ff00ff)
+        calculated = (s + (s >> 16) + (s >> 32)) & 0xff
+        if checksum != calculated and self.verbose:
             self.print_verbose(
                     f'bad checksum: {calculated:#x} (expected {checksum:#x})')
         return checksum == calculated
@@ -87,41 +248,57 @@ class Acurite523(Acurite):
         :param int block: the block of data to validate
         :return: True if block is good, False if bad
         """
-        self.print_verbose(f'[{block:048b}] ', end='')
-        if block == 0:
+        # Each verbose call is guarded so the f-strings are never built on
+        # the non-verbose production path
+        if self.verbose:
+            self.print_verbose(f'[{block:048b}] ', end='')
+        # Noise vastly outnumbers real frames, so the one-lookup signature
+        # test goes first and spares the checksum and decode for misses;
+        # it also rejects all-zero blocks, since 0 is not a device signature
+        signature = block >> 32
+        device = self.devices.get(signature)
+        if device is None:
+            if self.verbose:
+                self.print_verbose(f'bad signature: {signature:#x}')
             return 0
         if not self.validate_checksum(block):
             return 0
-        signature = block >> 32
-        battery = (block >> 30) & 0x03
-        temp = ((block >> 9) & 0x3f80) | ((block >> 8) & 0x7f)
-        temp = (temp - 1800) / 18
-        if temp < -40 and temp >= 70:
-            self.print_verbose(f'invalid temperature {temp}F')
+        # The high bit of each temperature byte is an even-parity bit
+        # (00592-family framing); bit_count lowers to a popcount, so each
+        # test is one instruction
+        if (((block >> 8) & 0xff).bit_count() & 1 or
+                ((block >> 16) & 0xff).bit_count() & 1):
+            if self.verbose:
+                self.print_verbose('bad parity')
             return 0
-        if signature == SIG_FREEZER:
-            if self.freezer_signature == -1:
-                self.freezer_signature = signature
-            self.freezer_temp = temp
-            self.freezer_battery = battery
-            self.freezer_signal += 1
-            self.print_verbose('freezer: ', end='')
-        elif signature == SIG_FRIDGE:
-            if self.fridge_signature == -1:
-                self.fridge_signature = signature
-            self.fridge_temp = temp
-            self.fridge_battery = battery
-            self.fridge_signal += 1
-            self.print_verbose('fridge: ', end='')
-        else:
-            self.print_verbose(f'bad signature: {signature:#x}')
+        battery = (block >> 30) & 0x03
+        # Tenths of a degree end-to-end: the payload packs this integer
+        # directly, so no float ever enters the per-frame path
+        tenths = int(_TEMP_LUT[((block >> 9) & 0x3f80) | ((block >> 8) & 0x7f)])
+        if tenths < -400 or tenths >= 700:
+            if self.verbose:
+                self.print_verbose(f'invalid temperature {tenths / 10}C')
             return 0
-        self.print_verbose(f'battery={battery}, {temp:.1f}C')
+        if device['signature'] == -1:
+            device['signature'] = signature
+        device['temp_tenths'] = tenths
+        device['battery'] = battery
+        device['signal'] += 1
+        if self.verbose:
+            # One formatted line per good frame: the device name is cached
+            # in its dict entry and the whole report goes out in one write
+            self.print_verbose(
+                    f'{device["name"]}: battery={battery}, '
+                    f'{tenths / 10:.1f}C')
         return signature
 
     class ChunkBuilder:
         """Parsing and chunk-building for model-specific RF signals.
         """
+        __slots__ = ('chunk', 'block', 'block_size', 'last_rfs_type',
+                'is_acurite', 'block_open', 'chunk_open',
+                'block_opener_count')
+
         def __init__(self):
             self.chunk = []      # All blocks received in a single chunk
             self.block = 0       # All bits received in a single block
@@ -133,107 +310,85 @@ class Acurite523(Acurite):
             self.block_opener_count = 0
 
         def get_rfs_type(self, rfs, duration):
-            """Returns the type of RF signal received.
-            :param int rfs: RF signal received; either 0 or 1
-            :param int duration: signal duration, in microseconds
-            :return: the signal type
-            :rtype: int
+            """Returns the type of RF signal received. Delegates to the
+            module-level classifier so there is only one copy of the
+            duration thresholds.
+            """
+            return get_rfs_type(rfs, duration)
+
+        def parse_edges(self, durations, rfs):
+            """Parses a whole array of RF edges in one fused pass:
+            classification and chunk-building run in the same kernel loop,
+            so no intermediate signal-type array is allocated.
+
+            :param durations: array of signal durations, in microseconds
+            :param rfs: array of RF signals received; each either 0 or 1
             """
-            if rfs == 0:
-                if duration >= 100 and duration < 300:
-                    return SIGNAL_BIT_0_OFF
-                elif duration >= 300 and duration < 500:
-                    return SIGNAL_BIT_1_OFF
-                elif duration >= 500 and duration < 700:
-                    return SIGNAL_BLOCK_OFF
-            elif rfs == 1:
-                if duration >= 100 and duration < 300:
-                    return SIGNAL_BIT_1_ON
-                elif duration >= 300 and duration < 500:
-                    return SIGNAL_BIT_0_ON
-                elif duration >= 500 and duration < 700:
-                    return SIGNAL_BLOCK_ON
-                elif duration >= 20000 and duration < 60000:
-                    return SIGNAL_CHUNK_END
-            return SIGNAL_INV
-
-        def is_bit_signal(self, rfs_type):
-            return rfs_type == SIGNAL_BIT_0 or rfs_type == SIGNAL_BIT_1
+            # A block takes at least 96 edges plus its openers, so this
+            # bound cannot be outgrown
+            out_blocks = np.empty(durations.shape[0] // 96 + 2,
+                    dtype=np.int64)
+            (n, last_rfs_type, chunk_open, block_open, block_size, block,
+                    block_opener_count, is_acurite) = _parse_stream(
+                    durations, rfs, self.last_rfs_type, self.chunk_open,
+                    self.block_open, self.block_size, self.block,
+                    self.block_opener_count, self.is_acurite, out_blocks)
+            self.last_rfs_type = int(last_rfs_type)
+            self.chunk_open = bool(chunk_open)
+            self.block_open = bool(block_open)
+            self.block_size = int(block_size)
+            self.block = int(block)
+            self.block_opener_count = int(block_opener_count)
+            self.is_acurite = bool(is_acurite)
+            for i in range(n):
+                self.chunk.append(int(out_blocks[i]))
 
         def parse_rf(self, duration, rfs):
             """Parse a single RF signal and update chunk/blocks.
             """
-            rfs_type = SIGNAL_INV
-            rfs_type = self.get_rfs_type(rfs, duration)
-            #self.print_debug(f'{rfs} {duration}')
-            if self.last_rfs_type == SIGNAL_BLOCK_OFF or not self.chunk_open:
-                if rfs_type == SIGNAL_BLOCK_ON:
-                    self.block_opener_count += 1
-                if self.block_opener_count == 4:
-                    self.block_opener_count = 0
-                    if not self.chunk_open:
-                        # Chunk start
-                        self.chunk_open = True
-                        self.block_open = True
-                        self.is_acurite = True
-                        self.block_size = 0
-                        self.block = 0
-                    # Block start
-            elif self.last_rfs_type == SIGNAL_BIT_0_OFF and self.chunk_open:
-                if rfs_type == SIGNAL_BIT_0_ON and self.block_size < SIGNAL_BIT_LENGTH:
-                    self.block_size += 1
-                elif rfs_type == SIGNAL_BIT_1_ON and self.block_size == SIGNAL_BIT_LENGTH:
-                    # Block end
-                    if self.block_size == SIGNAL_BIT_LENGTH:
-                        self.chunk.append(self.block)
-                    self.block_open = False
-                    self.block_size = 0
-                    self.block = 0
-                elif rfs_type == SIGNAL_CHUNK_END:
-                    # Chunk end
-                    self.block_open = False
-                    self.chunk_open = False
-                    self.block_size = 0
-                    self.block = 0
-                self.block_opener_count = 0
-            elif self.last_rfs_type == SIGNAL_BIT_1_OFF and self.chunk_open:
-                if rfs_type == SIGNAL_BIT_1_ON and self.block_size < SIGNAL_BIT_LENGTH:
-                    self.block |= (1 << (SIGNAL_BIT_LENGTH - self.block_size - 1))
-                    self.block_size += 1
-            elif rfs_type == SIGNAL_INV:
-                self.block_opener_count = 0
-                self.block_open = False
-                self.chunk_open = False
-                self.block_size = 0
-                self.block = 0
-            # Done
-            self.last_rfs_type = rfs_type
+            self.parse_edges(np.array([duration], dtype=np.int32),
+                    np.array([rfs], dtype=np.int8))
 
     def validate_rf(self, builder):
         """Parses received RF signals.
         """
         # Now validate entire chunk
-        now = datetime.now()
         freezer_signal = 0
         fridge_signal = 0
         chunk = builder.chunk
         if builder.is_acurite and len(chunk) > 0:
             if builder.block_size == SIGNAL_BIT_LENGTH:
                 chunk.append(builder.block)
-            self.print_verbose(f'[{now}] {{')
-            for block in chunk:
+            if self.verbose:
+                # Wall-clock time is only needed for the verbose header;
+                # all signal timing runs on the kernel monotonic clock
+                self.print_verbose(f'[{datetime.now()}] {{')
+                candidates = chunk
+            else:
+                # Reject zero and bad-checksum blocks for the whole chunk
+                # in one vectorized pass (same SWAR fold as
+                # validate_checksum); only survivors reach the scalar
+                # validator
+                blocks = np.asarray(chunk, dtype=np.uint64)
+                s = blocks >> 8
+                s = (s & 0x00ff00ff00ff) + ((s >> 8) & 0x00ff00ff00ff)
+                candidates = blocks[(blocks != 0) &
+                        (((s + (s >> 16) + (s >> 32)) & 0xff) ==
+                        (blocks & 0xff))].tolist()
+            for block in candidates:
                 signature = self.validate_block(block)
                 if signature == SIG_FREEZER:
                     freezer_signal += 1
                 elif signature == SIG_FRIDGE:
                     fridge_signal += 1
-            self.print_verbose('}')
+            if self.verbose:
+                self.print_verbose('}')
             if freezer_signal > 0:
-                self.freezer_signal = freezer_signal
+                self.devices[SIG_FREEZER]['signal'] = freezer_signal
                 if freezer_signal > 3:
                     freezer_signal = 3
             if fridge_signal > 0:
-                self.fridge_signal = fridge_signal
+                self.devices[SIG_FRIDGE]['signal'] = fridge_signal
                 if fridge_signal > 3:
                     fridge_signal = 3
 
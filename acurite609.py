@@ -21,10 +21,10 @@ while True:
         print(f'timeout')
 """
 
-from acurite import Acurite
+from acurite import Acurite, build_rfs_table, njit
 from datetime import datetime
 import ctypes
-import RPi.GPIO as GPIO
+import numpy as np
 import signal
 import socket
 import struct
@@ -44,6 +44,131 @@ SIGNAL_CHUNK_END = 5
 CHANNEL_ID = 2
 MULTICAST_TAG = 0xc261
 
+__all__ = ['Acurite609', 'MULTICAST_TAG', 'classify', 'get_rfs_type',
+        'peek_preamble']
+
+# Prebuilt so the format string is only parsed once, not per payload
+_PAYLOAD_STRUCT = struct.Struct('<Hbbhh')
+
+# Duration bin edges and matching signal types for each RF state, used to
+# classify whole edge arrays in one vectorized pass
+_BINS_OFF = np.array([1200], dtype=np.int32)
+_TYPES_OFF = np.array([SIGNAL_OFF, SIGNAL_INV], dtype=np.int8)
+_BINS_ON = np.array([300, 1200, 3000, 9000, 10000, 20000, 40000],
+        dtype=np.int32)
+_TYPES_ON = np.array([SIGNAL_CHUNK_START, SIGNAL_BIT_0, SIGNAL_BIT_1,
+        SIGNAL_BLOCK_START, SIGNAL_INV, SIGNAL_BLOCK_END,
+        SIGNAL_CHUNK_END, SIGNAL_INV], dtype=np.int8)
+
+_BUCKET_US = 100                # Lookup table bucket width in microseconds
+_BUCKET_MAX = 400               # Durations >= 40000 us saturate here
+
+_RFS_TABLE = build_rfs_table(_BINS_OFF, _TYPES_OFF, _BINS_ON,
+        _TYPES_ON, _BUCKET_US, _BUCKET_MAX)
+
+# Bit masks indexed by bit position, so accumulating a bit is a table
+# load instead of a shift computed per bit
+_BIT_MASKS = np.int64(1) << np.arange(
+        SIGNAL_BIT_LENGTH - 1, -1, -1, dtype=np.int64)
+
+# Sign-extended value for every 13-bit raw temperature, so decoding needs
+# no sign branch
+_TEMP_LUT = np.arange(0x2000, dtype=np.int16)
+_TEMP_LUT[0x1000:] -= 0x2000
+
+def classify(durations, rfs):
+    """Classifies an entire array of RF edges in a single NumPy pass.
+
+    :param durations: array of signal durations, in microseconds
+    :param rfs: array of RF signals received; each either 0 or 1
+    :return: array of signal types, one per edge
+    :rtype: numpy.ndarray
+    """
+    return _RFS_TABLE[rfs, np.minimum(durations // _BUCKET_US, _BUCKET_MAX)]
+
+def get_rfs_type(rfs, duration):
+    """Returns the type of RF signal received.
+
+    :param int rfs: RF signal received; either 0 or 1
+    :param int duration: signal duration, in microseconds
+    :return: the signal type
+    :rtype: int
+    """
+    return int(_RFS_TABLE[rfs, min(duration // _BUCKET_US, _BUCKET_MAX)])
+
+def peek_preamble(durations, rfs):
+    """Cheaply checks whether an edge array could contain a 609 chunk by
+    looking for the 3-9 ms on-pulse that starts every block.
+
+    :param durations: array of signal durations, in microseconds
+    :param rfs: array of RF signals received; each either 0 or 1
+    :rtype: bool
+    """
+    return bool(np.any((rfs == 1) & (durations >= 3000) & (durations < 9000)))
+
+@njit(cache=True)
+def _parse_stream(durations, rfs, last_rfs_type, chunk_open, block_open,
+        block_size, block, is_acurite, out_blocks):
+    """Classifies an array of RF edges and runs the chunk-building state
+    machine over them in a single streaming pass, so the intermediate
+    signal-type array is never materialized. The whole decode is
+    integer-only, so numba (when installed) compiles this to machine
+    code; the pure-Python fallback is the same function.
+
+    :param durations: array of signal durations, in microseconds
+    :param rfs: array of RF signals received; each either 0 or 1
+    :param out_blocks: int64 output array for completed blocks
+    :return: (block count, last_rfs_type, chunk_open, block_open,
+        block_size, block, is_acurite)
+    :rtype: tuple
+    """
+    n = 0
+    for i in range(durations.shape[0]):
+        bucket = durations[i] // _BUCKET_US
+        if bucket > _BUCKET_MAX:
+            bucket = _BUCKET_MAX
+        rfs_type = _RFS_TABLE[rfs[i], bucket]
+        # Last signal must be SIGNAL_OFF
+        if last_rfs_type == SIGNAL_OFF and not chunk_open:
+            if rfs_type == SIGNAL_BLOCK_START:
+                chunk_open = True
+                block_open = True
+                is_acurite = True
+                block_size = 0
+                block = 0
+        elif last_rfs_type == SIGNAL_OFF and chunk_open:
+            if ((rfs_type == SIGNAL_BLOCK_START and not block_open) or
+                    (rfs_type == SIGNAL_BLOCK_END and block_open) or
+                    rfs_type == SIGNAL_CHUNK_END):
+                # Every block boundary commits then resets the same way;
+                # only the open flags differ per boundary type
+                if block_size == SIGNAL_BIT_LENGTH and n < out_blocks.shape[0]:
+                    out_blocks[n] = block
+                    n += 1
+                block_open = rfs_type == SIGNAL_BLOCK_START
+                if rfs_type == SIGNAL_CHUNK_END:
+                    chunk_open = False
+                block_size = 0
+                block = 0
+            elif block_open and SIGNAL_BIT_0 <= rfs_type <= SIGNAL_BIT_1:
+                # The bit codes are contiguous, so membership is one range
+                # test instead of a compare per code
+                # Branchless: a 0-bit ORs in zero rather than taking a
+                # data-dependent branch the predictor cannot learn on
+                # noisy input
+                if block_size < SIGNAL_BIT_LENGTH:
+                    block |= (np.int64(rfs_type == SIGNAL_BIT_1) *
+                            _BIT_MASKS[block_size])
+                block_size += 1
+        last_rfs_type = rfs_type
+    return (n, last_rfs_type, chunk_open, block_open, block_size, block,
+            is_acurite)
+
+# Warm the JIT cache at import so the first real chunk never pays the
+# compile cost mid-signal
+_parse_stream(np.zeros(1, dtype=np.int32), np.zeros(1, dtype=np.int8),
+        SIGNAL_INV, False, False, 0, 0, False, np.empty(1, dtype=np.int64))
+
 class Acurite609(Acurite):
     def __init__(self, pin_rx, verbose=False, debug=False):
         super().__init__(pin_rx, verbose, debug)
@@ -52,48 +177,31 @@ class Acurite609(Acurite):
         self.signal = 0
         self.temperature = None
         self.humidity = None
+        # Blocks already decoded and accepted; the sensor repeats each
+        # reading several times per chunk, so repeats short-circuit here
+        self._decoded_cache = {}
 
     def create_payload(self, signal_type):
-        return struct.pack('<Hbbhh', MULTICAST_TAG, 
-                self.battery, self.signal, 
+        return _PAYLOAD_STRUCT.pack(MULTICAST_TAG,
+                self.battery, self.signal,
                 int(self.temperature * 10), int(self.humidity * 10))
 
     def get_rfs_type(self, rfs, duration):
-        """Returns the type of RF signal received.
-
-        :param int rfs: RF signal received; either 0 or 1
-        :param int duration: signal duration, in microseconds
-        :return: the signal type
-        :rtype: int
+        """Returns the type of RF signal received. Delegates to the
+        module-level classifier so there is only one copy of the duration
+        thresholds.
         """
-        if rfs == 0:
-            if duration < 1200:
-                return SIGNAL_OFF
-        elif rfs == 1:
-            if duration < 300:
-                return SIGNAL_CHUNK_START
-            elif duration >= 300 and duration < 1200:
-                return SIGNAL_BIT_0
-            elif duration >= 1200 and duration < 3000:
-                return SIGNAL_BIT_1
-            elif duration >= 3000 and duration < 9000:
-                return SIGNAL_BLOCK_START
-            elif duration >= 10000 and duration < 20000:
-                return SIGNAL_BLOCK_END
-            elif duration >= 20000 and duration < 40000:
-                return SIGNAL_CHUNK_END
-        return SIGNAL_INV
-
-    def is_bit_signal(self, rfs_type):
-        return rfs_type == SIGNAL_BIT_0 or rfs_type == SIGNAL_BIT_1
+        return get_rfs_type(rfs, duration)
 
     def validate_checksum(self, block):
         checksum = block & 0xff
-        calculated = (((block >> 8) & 0xff) + 
-                ((block >> 16) & 0xff) +
-                ((block >> 24) & 0xff) + 
-                ((block >> 32))) & 0xff
-        if checksum != calculated:
+        # Sum the four payload bytes SWAR-style: fold adjacent bytes into
+        # 16-bit lanes, then fold the lanes together; only the low byte of
+        # the total matters
+        s = block >> 8
+        s = (s & 0x00ff00ff) + ((s >> 8) & 0x00ff00ff)
+        calculated = (s + (s >> 16)) & 0xff
+        if checksum != calculated and self.verbose:
             self.print_verbose(
                     f'bad checksum: {calculated:#x} (expected {checksum:#x})')
         return checksum == calculated
@@ -104,42 +212,66 @@ class Acurite609(Acurite):
         :param int block: the block of data to validate
         :return: True if block is good, False if bad
         """
-        self.print_verbose(f'[{block:040b}] ', end='')
-        if block == 0:
+        # Repeated blocks skip the full decode; verbose mode always decodes
+        # so the diagnostic output stays complete
+        if not self.verbose:
+            cached = self._decoded_cache.get(block)
+            if cached is not None:
+                self.battery, self.temperature, self.humidity = cached
+                return True
+        # Each verbose call is guarded so the f-strings are never built on
+        # the non-verbose production path
+        if self.verbose:
+            self.print_verbose(f'[{block:040b}] ', end='')
+        # Once a signature has been learned, mismatches are rejected on
+        # that one compare before any channel or checksum math; learning
+        # itself still requires a block that passes both. All-zero blocks
+        # need no guard of their own: channel 0 never matches CHANNEL_ID
+        signature = block >> 32
+        if self.signature != -1 and self.signature != signature:
+            if self.verbose:
+                self.print_verbose(f'bad signature: {signature:#x}')
             return False
         channel = (block >> 28) & 0x03
         if channel != CHANNEL_ID:
-            self.print_verbose(
-                    f'bad channel: {channel} (expected {CHANNEL_ID})')
+            if self.verbose:
+                self.print_verbose(
+                        f'bad channel: {channel} (expected {CHANNEL_ID})')
             return False
         if not self.validate_checksum(block):
             return False
-        signature = block >> 32
         if self.signature == -1:
             self.signature = signature
-        elif self.signature != signature:
-            self.print_verbose(f'bad signature: {signature:#x}')
-            return False
         self.battery = (block >> 30) & 0x03
-        self.print_verbose(
-                f'signature={self.signature:x}, battery={self.battery}, ', end='')
-        temp = (block >> 15) & 0x1fff
-        if temp & 0x1000 == 0x1000:
-            temp = -(0x2000 - temp)
-        temp /= 20
+        if self.verbose:
+            self.print_verbose(
+                    f'signature={self.signature:x}, battery={self.battery}, ',
+                    end='')
+        # Bounds are checked on the raw twentieths-of-a-degree value so the
+        # float division only happens for blocks that are accepted
+        traw = int(_TEMP_LUT[(block >> 15) & 0x1fff])
         hum = (block >> 8) & 0x7f
-        if hum >= 1 and hum <= 99 and temp >= -40 and temp <= 70:
+        if 1 <= hum <= 99 and -800 <= traw <= 1400:
+            temp = traw / 20
             self.humidity = hum
             self.temperature = temp
-            self.print_verbose(f'{temp:.1f}C {hum}%')
+            if len(self._decoded_cache) > 64:
+                self._decoded_cache.clear()
+            self._decoded_cache[block] = (self.battery, temp, hum)
+            if self.verbose:
+                self.print_verbose(f'{temp:.1f}C {hum}%')
             return True
         else:
-            self.print_verbose(f'invalid temperature {temp}F')
+            if self.verbose:
+                self.print_verbose(f'invalid temperature {traw / 20}F')
             return False
 
     class ChunkBuilder:
         """Parsing and chunk-building for model-specific RF signals.
         """
+        __slots__ = ('chunk', 'block', 'block_size', 'last_rfs_type',
+                'is_acurite', 'block_open', 'chunk_open')
+
         def __init__(self):
             self.chunk = []      # Will contain all blocks received in a single chunk
             self.block = 0       # Will contain all bits received in a single block
@@ -150,91 +282,75 @@ class Acurite609(Acurite):
             self.chunk_open = False
 
         def get_rfs_type(self, rfs, duration):
-            """Returns the type of RF signal received.
+            """Returns the type of RF signal received. Delegates to the
+            module-level classifier so there is only one copy of the
+            duration thresholds.
+            """
+            return get_rfs_type(rfs, duration)
+
+        def parse_edges(self, durations, rfs):
+            """Parses a whole array of RF edges in one fused pass:
+            classification and chunk-building run in the same kernel loop,
+            so no intermediate signal-type array is allocated.
 
-            :param int rfs: RF signal received; either 0 or 1
-            :param int duration: signal duration, in microseconds
-            :return: the signal type
-            :rtype: int
+            :param durations: array of signal durations, in microseconds
+            :param rfs: array of RF signals received; each either 0 or 1
             """
-            if rfs == 0:
-                if duration < 1200:
-                    return SIGNAL_OFF
-            elif rfs == 1:
-                if duration < 300:
-                    return SIGNAL_CHUNK_START
-                elif duration >= 300 and duration < 1200:
-                    return SIGNAL_BIT_0
-                elif duration >= 1200 and duration < 3000:
-                    return SIGNAL_BIT_1
-                elif duration >= 3000 and duration < 9000:
-                    return SIGNAL_BLOCK_START
-                elif duration >= 10000 and duration < 20000:
-                    return SIGNAL_BLOCK_END
-                elif duration >= 20000 and duration < 40000:
-                    return SIGNAL_CHUNK_END
-            return SIGNAL_INV
-
-        def is_bit_signal(self, rfs_type):
-            return rfs_type == SIGNAL_BIT_0 or rfs_type == SIGNAL_BIT_1
+            # A block takes at least 80 edges, so this bound cannot be
+            # outgrown
+            out_blocks = np.empty(durations.shape[0] // 80 + 2,
+                    dtype=np.int64)
+            (n, last_rfs_type, chunk_open, block_open, block_size, block,
+                    is_acurite) = _parse_stream(
+                    durations, rfs, self.last_rfs_type, self.chunk_open,
+                    self.block_open, self.block_size, self.block,
+                    self.is_acurite, out_blocks)
+            self.last_rfs_type = int(last_rfs_type)
+            self.chunk_open = bool(chunk_open)
+            self.block_open = bool(block_open)
+            self.block_size = int(block_size)
+            self.block = int(block)
+            self.is_acurite = bool(is_acurite)
+            for i in range(n):
+                self.chunk.append(int(out_blocks[i]))
 
         def parse_rf(self, duration, rfs):
             """Parse a single RF signal and update chunk/blocks.
             """
-            rfs_type = SIGNAL_INV
-            rfs_type = self.get_rfs_type(rfs, duration)
-            #self.print_debug(f'{rfs} {duration}')
-            # Last signal must be SIGNAL_OFF
-            if self.last_rfs_type == SIGNAL_OFF and not self.chunk_open:
-                if rfs_type == SIGNAL_BLOCK_START:
-                    self.chunk_open = True
-                    self.block_open = True
-                    self.is_acurite = True
-                    self.block_size = 0
-                    self.block = 0
-            elif self.last_rfs_type == SIGNAL_OFF and self.chunk_open:
-                if rfs_type == SIGNAL_BLOCK_START and not self.block_open:
-                    if self.block_size == SIGNAL_BIT_LENGTH:
-                        self.chunk.append(self.block)
-                    self.block_open = True
-                    self.block_size = 0
-                    self.block = 0
-                elif rfs_type == SIGNAL_BLOCK_END and self.block_open:
-                    if self.block_size == SIGNAL_BIT_LENGTH:
-                        self.chunk.append(self.block)
-                    self.block_open = False
-                    self.block_size = 0
-                    self.block = 0
-                elif rfs_type == SIGNAL_CHUNK_END:
-                    self.last_rfs_type = rfs_type
-                    if self.block_size == SIGNAL_BIT_LENGTH:
-                        self.chunk.append(self.block)
-                    self.block_open = False
-                    self.chunk_open = False
-                    self.block_size = 0
-                    self.block = 0
-                elif self.is_bit_signal(rfs_type) and self.block_open:
-                    if rfs_type == SIGNAL_BIT_1 and self.block_size < SIGNAL_BIT_LENGTH:
-                        self.block |= (1 << (SIGNAL_BIT_LENGTH - self.block_size - 1))
-                    self.block_size += 1
-            # Done
-            self.last_rfs_type = rfs_type
+            self.parse_edges(np.array([duration], dtype=np.int32),
+                    np.array([rfs], dtype=np.int8))
 
     def validate_rf(self, builder):
         """Parses received RF signals.
         """
         # Now validate entire chunk
-        now = datetime.now()
         self.signal = 0
         chunk = builder.chunk
         if builder.is_acurite and len(chunk) > 0:
             if builder.block_size == SIGNAL_BIT_LENGTH:
                 chunk.append(builder.block)
-            self.print_verbose(f'[{now}] {{')
-            for block in chunk:
-                if self.validate_block(block):
-                    self.signal += 1
-            self.print_verbose('}')
+            if self.verbose:
+                # Wall-clock time is only needed for the verbose header;
+                # all signal timing runs on the kernel monotonic clock
+                self.print_verbose(f'[{datetime.now()}] {{')
+                for block in chunk:
+                    if self.validate_block(block):
+                        self.signal += 1
+                self.print_verbose('}')
+            else:
+                # Reject zero, wrong-channel and bad-checksum blocks for
+                # the whole chunk in one vectorized pass; only survivors
+                # reach the scalar validator, which still handles
+                # signature agreement and value bounds
+                blocks = np.asarray(chunk, dtype=np.uint64)
+                s = blocks >> 8
+                s = (s & 0x00ff00ff) + ((s >> 8) & 0x00ff00ff)
+                valid = ((blocks != 0) &
+                        (((blocks >> 28) & 3) == CHANNEL_ID) &
+                        (((s + (s >> 16)) & 0xff) == (blocks & 0xff)))
+                for block in blocks[valid].tolist():
+                    if self.validate_block(block):
+                        self.signal += 1
             if self.signal > 6:
                 self.signal = 6
 
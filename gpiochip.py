@@ -0,0 +1,102 @@
+#!/usr/bin/python3 -u
+
+"""
+Minimal interface to the Linux GPIO character device (v2 ABI) for reading
+edge events with kernel timestamps. Used in place of busy-polling the data
+pin: the kernel latches every transition with a nanosecond timestamp and
+the reader simply blocks on the line file descriptor until events arrive,
+so no CPU is burned while the line is idle and no short pulse is missed
+between samples.
+"""
+
+import fcntl
+import numpy as np
+import os
+import select
+import struct
+
+GPIO_V2_GET_LINE_IOCTL = 0xc250b407
+GPIO_V2_LINE_FLAG_INPUT = 1 << 2
+GPIO_V2_LINE_FLAG_EDGE_RISING = 1 << 4
+GPIO_V2_LINE_FLAG_EDGE_FALLING = 1 << 5
+GPIO_V2_LINE_EVENT_RISING_EDGE = 1
+GPIO_V2_LINE_EVENT_FALLING_EDGE = 2
+CONSUMER = b'acurite'
+EVENT_BUFFER_SIZE = 1024        # Kernel-side edge event ring capacity
+
+# struct gpio_v2_line_request: offsets[64], consumer[32], config (flags,
+# num_attrs, padding, attrs[10]), num_lines, event_buffer_size, padding, fd
+_LINE_REQUEST = struct.Struct('=64I32sQI20x240xII20xi')
+
+# struct gpio_v2_line_event: timestamp_ns, id, offset, seqno, line_seqno,
+# padding
+_LINE_EVENT = struct.Struct('=QIIII24x')
+
+# Same layout as a NumPy record type, so a whole batch of events can be
+# parsed with one frombuffer call instead of one unpack per event
+_EVENT_DTYPE = np.dtype([('timestamp_ns', '<u8'), ('id', '<u4'),
+        ('offset', '<u4'), ('seqno', '<u4'), ('line_seqno', '<u4'),
+        ('padding', '<u4', (6,))])
+
+class GpioLine:
+    """Requests a single GPIO line from the kernel for both-edge event
+    monitoring.
+
+    :param int pin: BCM pin number of the line to monitor
+    :param str chip: path to the GPIO character device
+    """
+    def __init__(self, pin, chip='/dev/gpiochip0'):
+        self.pin = pin
+        flags = (GPIO_V2_LINE_FLAG_INPUT |
+                GPIO_V2_LINE_FLAG_EDGE_RISING |
+                GPIO_V2_LINE_FLAG_EDGE_FALLING)
+        offsets = [0] * 64
+        offsets[0] = pin
+        request = bytearray(_LINE_REQUEST.pack(
+                *offsets, CONSUMER, flags, 0, 1, EVENT_BUFFER_SIZE, -1))
+        chip_fd = os.open(chip, os.O_RDONLY)
+        try:
+            fcntl.ioctl(chip_fd, GPIO_V2_GET_LINE_IOCTL, request)
+        finally:
+            os.close(chip_fd)
+        self.fd = _LINE_REQUEST.unpack(request)[-1]
+        self.poller = select.epoll()
+        self.poller.register(self.fd, select.EPOLLIN)
+
+    def read_event(self, timeout=None):
+        """Waits for the next edge event on the line.
+
+        :param timeout: timeout in milliseconds or None to wait indefinitely
+        :return: (timestamp_ns, rising) pair or None on timeout; the
+            timestamp is CLOCK_MONOTONIC-based
+        :rtype: tuple
+        """
+        if not self.poller.poll(-1 if timeout is None else timeout / 1000):
+            return None
+        data = os.read(self.fd, _LINE_EVENT.size)
+        timestamp_ns, event_id, _, _, _ = _LINE_EVENT.unpack(data)
+        return timestamp_ns, event_id == GPIO_V2_LINE_EVENT_RISING_EDGE
+
+    def read_events(self, timeout=None, max_events=EVENT_BUFFER_SIZE):
+        """Waits for edge events on the line and drains as many as one
+        read syscall returns, so a burst of edges costs one wake-up
+        instead of one per edge.
+
+        :param timeout: timeout in milliseconds or None to wait indefinitely
+        :param int max_events: maximum number of events to read at once
+        :return: (timestamps_ns, rising) array pair or None on timeout;
+            timestamps are CLOCK_MONOTONIC-based int64 nanoseconds
+        :rtype: tuple
+        """
+        if not self.poller.poll(-1 if timeout is None else timeout / 1000):
+            return None
+        data = os.read(self.fd, _LINE_EVENT.size * max_events)
+        events = np.frombuffer(data, dtype=_EVENT_DTYPE)
+        return (events['timestamp_ns'].astype(np.int64),
+                events['id'] == GPIO_V2_LINE_EVENT_RISING_EDGE)
+
+    def close(self):
+        """Releases the line back to the kernel.
+        """
+        self.poller.close()
+        os.close(self.fd)
@@ -1,5 +1,6 @@
 #!/usr/bin/python3 -u
 
+from collections import deque
 from datetime import datetime
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -17,10 +18,18 @@ MULTICAST_ADDR = '224.3.29.70'
 MULTICAST_PORT = 50000
 MAX_XAXIS = 10000
 
+# Prebuilt so the format strings are only parsed once, not per packet
+_TAG_STRUCT = struct.Struct('<H')
+_P609_STRUCT = struct.Struct('<bbhh')
+_P523_STRUCT = struct.Struct('<bbh')
+_NOISE_STRUCT = struct.Struct('<Ib')
+
 class Plotter():
     def __init__(self):
-        self.noise = [ 0 ]
-        self.dates = [ None ]
+        # Bounded deques drop old samples in O(1) instead of reslicing a
+        # 10k-entry list on every noise packet
+        self.noise = deque([ 0 ], maxlen=MAX_XAXIS)
+        self.dates = deque([ None ], maxlen=MAX_XAXIS)
 
     def create_multicast(self):
         # socket
@@ -76,9 +85,12 @@ class Plotter():
         #ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
         #ax.xaxis.set_major_locator(plt.MaxNLocator(10))
         self.lines, = ax.plot([], [])
+        # Fixed Y limits set once here so blitting only has to redraw the
+        # line itself; ~30 fps is plenty for a noise trace
+        ax.set_ylim([-0.05, 1.05])
         #self.fig.tight_layout()
         animation = FuncAnimation(
-                self.fig, self.animate, interval=1, 
+                self.fig, self.animate, interval=33, blit=True,
                 repeat=False, cache_frame_data=False)
         from PyQt5 import QtWidgets
         from PyQt5.QtCore import Qt
@@ -91,11 +103,11 @@ class Plotter():
 
     # update
     def animate(self, frame):
-        self.lines.set_data(self.dates, self.noise)
-        self.fig.gca().set_ylim([-0.05, 1.05])
-        self.fig.gca().relim()
-        self.fig.gca().autoscale_view()
-        return self.lines
+        self.lines.set_data(list(self.dates), list(self.noise))
+        ax = self.fig.gca()
+        ax.relim()
+        ax.autoscale_view(scaley=False)
+        return (self.lines,)
 
     def update(self):
         us = 0
@@ -110,30 +122,28 @@ class Plotter():
             if length < 2:
                 print(f'Invalid packet length {length} from {a}')
                 continue
-            tag, = struct.unpack('<H', d[:2])
+            tag, = _TAG_STRUCT.unpack_from(d)
             if tag == MULTICAST_TAG_609 and length == 8:
-                bat, sig, temp, hum = struct.unpack('<bbhh', d[2:])
+                bat, sig, temp, hum = _P609_STRUCT.unpack_from(d, 2)
                 temp /= 10
                 hum /= 10
                 temp = temp * 1.8 + 32
                 print(f'[Acurite609] bat={bat}, sig={sig}, {temp:0.1f}f {hum:0.0f}%')
             elif tag == MULTICAST_TAG_523_FREEZER and length == 6:
-                bat, sig, temp = struct.unpack('<bbh', d[2:])
+                bat, sig, temp = _P523_STRUCT.unpack_from(d, 2)
                 temp /= 10
                 temp = temp * 1.8 + 32
                 print(f'[Acurite523] Freezer: bat={bat}, sig={sig}, {temp:0.1f}f')
             elif tag == MULTICAST_TAG_523_FRIDGE and length == 6:
-                bat, sig, temp = struct.unpack('<bbh', d[2:])
+                bat, sig, temp = _P523_STRUCT.unpack_from(d, 2)
                 temp /= 10
                 temp = temp * 1.8 + 32
                 print(f'[Acurite523] Fridge: bat={bat}, sig={sig}, {temp:0.1f}f')
             elif tag == MULTICAST_TAG_NOISE and length == 7:
-                duration, rfs = struct.unpack('<Ib', d[2:])
+                duration, rfs = _NOISE_STRUCT.unpack_from(d, 2)
                 duration = int(duration / 200)
-                self.dates += [ i for i in range(us, us + duration) ]
-                self.dates = self.dates[-MAX_XAXIS:]
-                self.noise += [ rfs ] * duration
-                self.noise = self.noise[-MAX_XAXIS:]
+                self.dates.extend(range(us, us + duration))
+                self.noise.extend([ rfs ] * duration)
                 us += duration
             else:
                 print(f'Invalid packet length {length}')
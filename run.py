@@ -1,6 +1,7 @@
 #!/usr/bin/python3 -u
 
 from acumonitor import Acumonitor
+import selectors
 
 MULTICAST_ADDR = '224.3.29.70'
 MULTICAST_PORT = 50000
@@ -10,9 +11,13 @@ acumonitor = Acumonitor(23, verbose=True)
 acumonitor.enable_server(MULTICAST_PORT)
 acumonitor.start()
 
+# The wait is a single kernel epoll_wait on the monitor's eventfd, so the
+# main thread burns no interpreter ticks between chunks
+sel = selectors.DefaultSelector()
+sel.register(acumonitor, selectors.EVENT_READ)
+
 while True:
-    if acumonitor.available(timeout=70):
-        pass
+    if sel.select(timeout=70):
+        acumonitor.available(timeout=0)
     else:
         print(f'timeout')
-